@@ -1,12 +1,24 @@
+import asyncio
 import os
-from typing import Type, Optional
+import queue
+import re
+import threading
+from functools import lru_cache
+from string import Template
+from typing import Any, ClassVar, Dict, List, Tuple, Type, Optional
+import requests
+from cachetools import TTLCache
+from tenacity import retry, retry_if_exception_type, stop_after_attempt, wait_exponential
 from dotenv import load_dotenv
 from pydantic import BaseModel, Field
 from duckduckgo_search import DDGS
-from crewai import Agent, Task, Crew, Process
+from duckduckgo_search.exceptions import RatelimitException
+from crewai import LLM, Agent, Task, Crew, Process
 from crewai.tools import BaseTool
+from litellm.exceptions import APIConnectionError, RateLimitError, Timeout
 from config import Config
 from utils import Utils
+from cache import research_cache
 import logging
 
 # Load environment variables
@@ -14,6 +26,47 @@ load_dotenv()
 
 logger = logging.getLogger(__name__)
 
+# Static agent prompts, kept byte-identical across queries so the provider's
+# prompt prefix cache (automatic for OpenAI) can reuse them
+WEB_SEARCHER_PROFILE = {
+    "role": "Web Research Specialist",
+    "goal": "Find comprehensive and relevant information from web sources",
+    "backstory": "You are an expert web researcher with skills in finding accurate, up-to-date information from reliable sources."
+}
+
+RESEARCH_ANALYST_PROFILE = {
+    "role": "Research Analyst",
+    "goal": "Analyze search results and extract key insights and patterns",
+    "backstory": "You are a skilled analyst who can identify important information, trends, and insights from multiple sources."
+}
+
+TECHNICAL_WRITER_PROFILE = {
+    "role": "Technical Writer",
+    "goal": "Create well-structured, comprehensive research reports",
+    "backstory": "You are an expert technical writer who creates clear, organized, and informative reports with proper citations."
+}
+
+# Report headings that say nothing about the topic itself
+GENERIC_HEADINGS = {
+    "executive summary", "summary", "introduction", "overview", "conclusion",
+    "conclusions", "key findings", "search results", "references", "sources",
+    "citations", "research methodology", "methodology", "analysis"
+}
+HEADING_PATTERN = re.compile(r'^#{2,3}\s+(.+?)\s*$', re.MULTILINE)
+
+# At most two background prefetch batches at once; the worker threads are
+# daemons so a pending prefetch never holds up interpreter exit
+prefetch_slots = threading.BoundedSemaphore(2)
+
+# Failures worth a second crew run; auth, model and config errors are not
+TRANSIENT_LLM_ERRORS = (TimeoutError, ConnectionError, Timeout, APIConnectionError, RateLimitError)
+
+# Task description templates, compiled once; static instructions come first
+# and the query last so the prompt prefix stays stable
+SEARCH_TASK_TEMPLATE = Template(
+    "Search for comprehensive information, focusing on current, accurate, and relevant sources. Topic: $query"
+)
+
 class DuckDuckGoSearchInput(BaseModel):
     query: str = Field(description="The search query to perform")
 
@@ -22,21 +75,83 @@ class DuckDuckGoSearchTool(BaseTool):
     description: str = "Search the web for information using DuckDuckGo"
     args_schema: Type[BaseModel] = DuckDuckGoSearchInput
     
+    # Formatted results shared across tool instances to avoid DDG rate limits
+    _cache: ClassVar[TTLCache] = TTLCache(maxsize=Config.SEARCH_CACHE_SIZE, ttl=Config.SEARCH_CACHE_TTL)
+    _cache_lock: ClassVar[threading.Lock] = threading.Lock()
+    
+    # Idle DDGS sessions; each is checked out by one thread at a time
+    _sessions: ClassVar[queue.LifoQueue] = queue.LifoQueue(maxsize=4)
+    
+    @staticmethod
+    def _text_options() -> Dict[str, Any]:
+        """Keyword arguments for DDGS.text, leaving the backend to the library unless pinned"""
+        options = {"max_results": Config.MAX_SEARCH_RESULTS, "safesearch": "moderate"}
+        if Config.SEARCH_BACKEND:
+            options["backend"] = Config.SEARCH_BACKEND
+        return options
+    
+    @classmethod
+    @retry(
+        retry=retry_if_exception_type(RatelimitException),
+        wait=wait_exponential(multiplier=1, max=30),
+        stop=stop_after_attempt(3),
+        reraise=True
+    )
+    def _search(cls, query: str) -> list:
+        """Run a DDG text search on a pooled session, backing off on rate limits"""
+        try:
+            ddgs = cls._sessions.get_nowait()
+        except queue.Empty:
+            ddgs = DDGS(proxy=Config.DDG_PROXY, timeout=Config.SEARCH_TIMEOUT)
+        
+        # A session that raised is dropped rather than returned to the pool
+        results = list(ddgs.text(query, **cls._text_options()))
+        
+        try:
+            cls._sessions.put_nowait(ddgs)
+        except queue.Full:
+            pass
+        return results
+    
+    @classmethod
+    def _get_cached(cls, query: str) -> Optional[str]:
+        """Return cached formatted results for a query, if any"""
+        with cls._cache_lock:
+            cached = cls._cache.get(Utils.normalize_query(query))
+        if cached is not None:
+            Utils.log_info("Search cache hit for: %s", query)
+        return cached
+    
+    @classmethod
+    def _format_and_cache(cls, query: str, results: list) -> str:
+        """Format search results, caching them when non-empty"""
+        if not results:
+            return "No search results found."
+        
+        formatted = Utils.format_search_results(results)
+        
+        with cls._cache_lock:
+            cls._cache[Utils.normalize_query(query)] = formatted
+        return formatted
+    
     def _run(self, query: str) -> str:
         try:
-            Utils.log_info(f"Searching for: {query}")
+            cached = self._get_cached(query)
+            if cached is not None:
+                return cached
             
-            with DDGS() as ddgs:
-                results = list(ddgs.text(query, max_results=Config.MAX_SEARCH_RESULTS))
-                
-                if not results:
-                    return "No search results found."
-                
-                return Utils.format_search_results(results)
+            Utils.log_info("Searching for: %s", query)
+            
+            return self._format_and_cache(query, self._search(query))
                 
         except Exception as e:
             Utils.log_error(e, "DuckDuckGo search")
             return f"Search error: {str(e)}"
+    
+    async def _arun(self, query: str) -> str:
+        # AsyncDDGS (6.x only) just runs DDGS in an executor, so a worker
+        # thread over the pooled sessions is equivalent and works on 7.x too
+        return await asyncio.to_thread(self._run, query)
 
 def simple_research(query: str) -> str:
     """Simple research function that just searches and formats results"""
@@ -46,7 +161,7 @@ def simple_research(query: str) -> str:
         if not is_valid:
             return f"Invalid query: {message}"
         
-        Utils.log_info(f"Starting simple research for: {query}")
+        Utils.log_info("Starting simple research for: %s", query)
         
         # Use the search tool directly
         search_tool = DuckDuckGoSearchTool()
@@ -64,50 +179,62 @@ def simple_research(query: str) -> str:
         Utils.log_error(e, "simple_research")
         return f"Research error: {str(e)}"
 
+async def simple_research_async(query: str) -> str:
+    """Async variant of simple_research; the blocking search runs on a worker thread"""
+    return await asyncio.to_thread(simple_research, query)
+
+@lru_cache(maxsize=1)
+def get_llm():
+    """Get the shared LLM client, or None to let CrewAI use its default"""
+    llm_config = Config.get_llm_config()
+    
+    if llm_config["provider"] == "openai":
+        # A native crewai.LLM is passed through to every agent as-is; other LLM
+        # objects are rebuilt per Agent, which would defeat sharing it
+        return LLM(
+            model=llm_config["model"],
+            api_key=llm_config["api_key"],
+            temperature=0.1
+        )
+    
+    # Fallback to default or Ollama
+    return None
+
 def create_crew_with_llm(query: str) -> Optional[Crew]:
     """Create crew with LLM configuration"""
     try:
-        from langchain_openai import ChatOpenAI
-        
         search_tool = DuckDuckGoSearchTool()
         
         # Configure LLM
-        llm_config = Config.get_llm_config()
-        
-        if llm_config["provider"] == "openai":
-            llm = ChatOpenAI(
-                model=llm_config["model"],
-                api_key=llm_config["api_key"],
-                temperature=0.1
-            )
-        else:
-            # Fallback to default or Ollama
-            llm = None  # Let CrewAI use default
+        llm = get_llm()
         
         # Create agents
         web_searcher = Agent(
-            role="Web Research Specialist",
-            goal="Find comprehensive and relevant information from web sources",
-            backstory="You are an expert web researcher with skills in finding accurate, up-to-date information from reliable sources.",
+            **WEB_SEARCHER_PROFILE,
             verbose=Config.CREWAI_VERBOSE,
             allow_delegation=True,
             tools=[search_tool],
             llm=llm
         )
         
+        # One analyst per concurrent task; an Agent's executor keeps a single
+        # conversation and is not safe to share between threads
         research_analyst = Agent(
-            role="Research Analyst",
-            goal="Analyze search results and extract key insights and patterns",
-            backstory="You are a skilled analyst who can identify important information, trends, and insights from multiple sources.",
+            **RESEARCH_ANALYST_PROFILE,
+            verbose=Config.CREWAI_VERBOSE,
+            allow_delegation=True,
+            llm=llm
+        )
+        
+        trends_analyst = Agent(
+            **RESEARCH_ANALYST_PROFILE,
             verbose=Config.CREWAI_VERBOSE,
             allow_delegation=True,
             llm=llm
         )
         
         technical_writer = Agent(
-            role="Technical Writer",
-            goal="Create well-structured, comprehensive research reports",
-            backstory="You are an expert technical writer who creates clear, organized, and informative reports with proper citations.",
+            **TECHNICAL_WRITER_PROFILE,
             verbose=Config.CREWAI_VERBOSE,
             allow_delegation=False,
             llm=llm
@@ -115,29 +242,39 @@ def create_crew_with_llm(query: str) -> Optional[Crew]:
         
         # Create tasks
         search_task = Task(
-            description=f"Search for comprehensive information about: {query}. Focus on finding current, accurate, and relevant sources.",
+            description=SEARCH_TASK_TEMPLATE.substitute(query=query),
             agent=web_searcher,
             expected_output="Detailed search results with multiple sources and relevant information.",
             tools=[search_tool]
         )
         
-        analysis_task = Task(
-            description="Analyze the search results and identify key points, trends, and important insights.",
+        # Independent analyses run concurrently; the writer waits on both
+        key_points_task = Task(
+            description="Analyze the search results and identify the key points and important insights.",
             agent=research_analyst,
-            expected_output="Structured analysis highlighting key findings and insights.",
-            context=[search_task]
+            expected_output="Structured list of key findings and insights.",
+            context=[search_task],
+            async_execution=True
+        )
+        
+        trends_task = Task(
+            description="Analyze the search results and identify trends, patterns, and differing perspectives across sources.",
+            agent=trends_analyst,
+            expected_output="Structured analysis of trends and patterns across sources.",
+            context=[search_task],
+            async_execution=True
         )
         
         writing_task = Task(
             description="Create a comprehensive research report based on the analysis, including proper structure and citations.",
             agent=technical_writer,
             expected_output="A well-formatted research report with clear sections, key findings, and proper citations.",
-            context=[analysis_task]
+            context=[key_points_task, trends_task]
         )
         
         return Crew(
-            agents=[web_searcher, research_analyst, technical_writer],
-            tasks=[search_task, analysis_task, writing_task],
+            agents=[web_searcher, research_analyst, trends_analyst, technical_writer],
+            tasks=[search_task, key_points_task, trends_task, writing_task],
             verbose=Config.CREWAI_VERBOSE,
             process=Process.sequential
         )
@@ -146,6 +283,106 @@ def create_crew_with_llm(query: str) -> Optional[Crew]:
         Utils.log_error(e, "create_crew_with_llm")
         return None
 
+def synthesize_from_cache(query: str, neighbors: List[Tuple[float, str, str]]) -> Optional[str]:
+    """Answer a near-miss query from similar cached reports using the local Ollama model"""
+    related = [
+        (prior_query, report) for score, prior_query, report in neighbors
+        if score >= Config.CACHE_NEAR_MISS_THRESHOLD
+    ]
+    if not related:
+        return None
+    
+    try:
+        prior_reports = "\n\n".join(
+            f"### Prior report: {prior_query}\n{Utils.truncate_text(report, 2000)}"
+            for prior_query, report in related
+        )
+        prompt = (
+            "Given these prior research reports:\n\n"
+            f"{prior_reports}\n\n"
+            "Write a concise, well-structured markdown research report that answers the question below, "
+            "using only information from the prior reports and keeping their source citations.\n\n"
+            f"Question: {query}"
+        )
+        
+        response = requests.post(
+            f"{Config.OLLAMA_HOST}/api/generate",
+            json={"model": Config.OLLAMA_MODEL, "prompt": prompt, "stream": False},
+            timeout=Config.OLLAMA_TIMEOUT
+        )
+        response.raise_for_status()
+        answer = response.json().get("response", "").strip()
+        if not answer:
+            return None
+        
+        Utils.log_info("Synthesized answer from %d cached reports for: %s", len(related), query)
+        return answer
+        
+    except requests.RequestException as e:
+        # Ollama not running or too slow; fall through to a full crew run
+        Utils.log_info("Cache synthesis unavailable: %s", e)
+        return None
+    except Exception as e:
+        Utils.log_error(e, "synthesize_from_cache")
+        return None
+
+def extract_related_queries(query: str, report: str, limit: int = 3) -> List[str]:
+    """Derive follow-up queries from the section headings of a report"""
+    related = []
+    seen = set()
+    for heading in HEADING_PATTERN.findall(report):
+        topic = re.sub(r'^\d+[.)]?\s*', '', Utils.clean_text(heading)).strip(" -:.")
+        key = Utils.normalize_query(topic)
+        if len(key.split()) < 2 or key in GENERIC_HEADINGS or key in seen:
+            continue
+        seen.add(key)
+        related.append(f"{query} {topic}")
+        if len(related) >= limit:
+            break
+    return related
+
+def prefetch_query(query: str):
+    """Warm the research cache for a query using the cheap search path"""
+    try:
+        if research_cache.get_exact(query) is not None:
+            return
+        embedding = research_cache.embed(query)
+        if research_cache.lookup(embedding) is not None:
+            return
+        
+        report = simple_research(query)
+        if report.startswith(("Search error:", "Research error:", "Invalid query:")):
+            return
+        research_cache.put(query, report, embedding)
+        Utils.log_info("Prefetched related query: %s", query)
+    except Exception as e:
+        Utils.log_error(e, "prefetch_query")
+
+def prefetch_related(query: str, report: str):
+    """Prefetch related queries from a report on a background daemon thread"""
+    related = extract_related_queries(query, report, Config.PREFETCH_MAX_QUERIES)
+    if not related or not prefetch_slots.acquire(blocking=False):
+        return
+    
+    def worker():
+        try:
+            for related_query in related:
+                prefetch_query(related_query)
+        finally:
+            prefetch_slots.release()
+    
+    threading.Thread(target=worker, name="prefetch", daemon=True).start()
+
+@retry(
+    retry=retry_if_exception_type(TRANSIENT_LLM_ERRORS),
+    stop=stop_after_attempt(2),
+    wait=wait_exponential(multiplier=1, max=10),
+    reraise=True
+)
+def kickoff_crew(crew: Crew):
+    """Run the crew, retrying once on transient failures"""
+    return crew.kickoff()
+
 def run_research(query: str) -> str:
     """Main research function with multiple fallback strategies"""
     try:
@@ -154,45 +391,56 @@ def run_research(query: str) -> str:
         if not is_valid:
             return f"Invalid query: {message}"
         
-        Utils.log_info(f"Starting research for: {query}")
-        
-        # Strategy 1: Try CrewAI with LLM
-        if Config.has_openai_key():
-            try:
-                crew = create_crew_with_llm(query)
-                if crew:
-                    Utils.log_info("Using CrewAI with LLM")
-                    result = crew.kickoff()
-                    
-                    # Handle different result types
-                    if hasattr(result, 'raw'):
-                        return result.raw
-                    elif hasattr(result, 'result'):
-                        return result.result
-                    else:
-                        return str(result)
-                        
-            except Exception as e:
-                Utils.log_error(e, "CrewAI with LLM")
-        
-        # Strategy 2: Try CrewAI without LLM configuration
+        Utils.log_info("Starting research for: %s", query)
+        
+        # Serve repeated or paraphrased queries from the cache
+        query_embedding = None
+        if Config.CACHE_ENABLED:
+            cached = research_cache.get_exact(query)
+            if cached is None:
+                query_embedding = research_cache.embed(query)
+                cached = research_cache.lookup(query_embedding)
+            if cached is not None:
+                research_cache.record("hits")
+            elif Config.CACHE_SYNTHESIS_ENABLED:
+                cached = synthesize_from_cache(query, research_cache.top_k(query_embedding, k=3))
+                if cached is not None:
+                    research_cache.record("near_miss")
+                    research_cache.put(query, cached, query_embedding)
+            if cached is not None:
+                Utils.log_info("Cache hit for: %s (%s)", query, research_cache)
+                return cached
+            research_cache.record("misses")
+        
+        # Strategy 1: CrewAI with the configured LLM (CrewAI default if none)
         try:
-            Utils.log_info("Trying CrewAI with default configuration")
-            crew = create_crew_with_llm(query)  # Will use default LLM
+            crew = create_crew_with_llm(query)
             if crew:
-                result = crew.kickoff()
+                Utils.log_info("Using CrewAI with %s", "OpenAI" if Config.has_openai_key() else "default LLM")
+                result = kickoff_crew(crew)
                 
+                # Handle different result types
                 if hasattr(result, 'raw'):
-                    return result.raw
+                    report = result.raw
                 elif hasattr(result, 'result'):
-                    return result.result
+                    report = result.result
                 else:
-                    return str(result)
-                    
+                    report = str(result)
+                
+                if hasattr(result, 'token_usage'):
+                    Utils.log_info("Token usage for %s: %s", query, result.token_usage)
+                
+                if Config.CACHE_ENABLED:
+                    research_cache.put(query, report, query_embedding)
+                    Utils.log_info("Cache stats: %s", research_cache)
+                    if Config.PREFETCH_ENABLED and research_cache.embed_fn is not None:
+                        prefetch_related(query, report)
+                return report
+                
         except Exception as e:
-            Utils.log_error(e, "CrewAI default")
+            Utils.log_error(e, "CrewAI")
         
-        # Strategy 3: Fallback to simple search
+        # Strategy 2: Fallback to simple search
         Utils.log_info("Falling back to simple search")
         return simple_research(query)
         
@@ -201,12 +449,13 @@ def run_research(query: str) -> str:
         return f"Research error: {str(e)}"
 
 def test_search_tool() -> Optional[str]:
-    """Test the search tool independently"""
+    """Test the search tool independently, bypassing the results cache"""
     try:
-        tool = DuckDuckGoSearchTool()
-        result = tool._run("artificial intelligence")
+        results = DuckDuckGoSearchTool._search("artificial intelligence")
+        if not results:
+            return None
         Utils.log_info("Search tool test successful!")
-        return result
+        return Utils.format_search_results(results)
     except Exception as e:
         Utils.log_error(e, "test_search_tool")
         return None
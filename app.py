@@ -10,6 +10,7 @@ sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 try:
     from agents import run_research, test_search_tool
+    from cache import research_cache
 except ImportError as e:
     st.error(f"Error importing agents module: {e}")
     st.error("Please ensure all required dependencies are installed by running: pip install -r requirements.txt")
@@ -116,10 +117,14 @@ with st.sidebar:
             except Exception as e:
                 st.error(f"❌ Error: {e}")
     
-    # Statistics
+    # Statistics, filled in after the chat handler so they include this run
     st.markdown("### 📊 Session Stats")
-    st.metric("Queries Processed", st.session_state.research_count)
-    st.metric("Messages", len(st.session_state.messages))
+    session_stats = st.container()
+    
+    # The research cache is shared by every session in this process
+    st.markdown("### 🗄️ Research Cache")
+    st.caption("Shared by all sessions on this server")
+    cache_stats_panel = st.container()
     
     # Configuration
     st.markdown("### ⚙️ Settings")
@@ -280,6 +285,16 @@ if prompt := st.chat_input("Ask a research question...", key="research_input"):
                 # Log error
                 Utils.log_error(e, "Streamlit app")
 
+# Stats, rendered into the sidebar placeholders
+with session_stats:
+    st.metric("Queries Processed", st.session_state.research_count)
+    st.metric("Messages", len(st.session_state.messages))
+
+with cache_stats_panel:
+    cache_stats = research_cache.get_stats()
+    st.metric("Cache Hit Rate", f"{cache_stats['hit_rate']:.0%}")
+    st.metric("Cached Reports", cache_stats["entries"])
+
 # Footer
 st.markdown("---")
 st.markdown("""
@@ -0,0 +1,158 @@
+import hashlib
+import importlib.util
+import threading
+import time
+from functools import lru_cache
+from typing import Callable, List, Optional, Tuple
+from config import Config
+from utils import Utils
+
+# Try to import embedding components; sentence-transformers pulls in torch,
+# so it is only located here and imported when the model is first needed
+try:
+    import numpy as np
+    EMBEDDINGS_AVAILABLE = importlib.util.find_spec("sentence_transformers") is not None
+except ImportError:
+    EMBEDDINGS_AVAILABLE = False
+
+@lru_cache(maxsize=1)
+def get_embedding_model():
+    """Load the sentence-transformers model once per process"""
+    from sentence_transformers import SentenceTransformer
+    return SentenceTransformer(Config.CACHE_EMBEDDING_MODEL)
+
+def embed_query(query: str):
+    """Embed a query as a normalized float32 vector"""
+    model = get_embedding_model()
+    return model.encode(Utils.normalize_query(query), normalize_embeddings=True).astype(np.float32)
+
+class SemanticCache:
+    """In-memory research report cache with exact and semantic lookup"""
+
+    def __init__(
+        self,
+        embed_fn: Optional[Callable[[str], "np.ndarray"]] = None,
+        threshold: float = 0.92,
+        ttl: int = 3600,
+        max_entries: int = 1000
+    ):
+        self.embed_fn = embed_fn
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._exact = {}
+        # (embedding, query, report, ts) tuples, kept in insertion order
+        self._entries: List[Tuple["np.ndarray", str, str, float]] = []
+        self._matrix = None
+        self.stats = {"hits": 0, "misses": 0, "near_miss": 0}
+
+    def __str__(self) -> str:
+        stats = self.get_stats()
+        return ", ".join(f"{key}={value}" for key, value in stats.items())
+
+    @staticmethod
+    def cache_key(query: str) -> str:
+        """Exact-match key for a normalized query"""
+        return hashlib.sha256(Utils.normalize_query(query).encode("utf-8")).hexdigest()
+
+    def _is_fresh(self, ts: float) -> bool:
+        return time.time() - ts < self.ttl
+
+    def get_exact(self, query: str) -> Optional[str]:
+        """Return a cached report for an identical (normalized) query"""
+        key = self.cache_key(query)
+        with self._lock:
+            entry = self._exact.get(key)
+            if entry is None:
+                return None
+            report, ts = entry
+            if not self._is_fresh(ts):
+                del self._exact[key]
+                return None
+            return report
+
+    def embed(self, query: str):
+        """Embed a query, or return None when semantic lookup is unavailable"""
+        if self.embed_fn is None:
+            return None
+        try:
+            return self.embed_fn(query)
+        except Exception as e:
+            Utils.log_error(e, "SemanticCache.embed")
+            return None
+
+    def top_k(self, embedding, k: int = 3) -> List[Tuple[float, str, str]]:
+        """Return up to k fresh (score, query, report) neighbors, best first"""
+        if embedding is None:
+            return []
+        with self._lock:
+            if self._matrix is None:
+                return []
+            scores = self._matrix @ embedding
+            neighbors = []
+            for index in np.argsort(scores)[::-1]:
+                _, query, report, ts = self._entries[index]
+                if self._is_fresh(ts):
+                    neighbors.append((float(scores[index]), query, report))
+                    if len(neighbors) == k:
+                        break
+            return neighbors
+
+    def lookup(self, embedding) -> Optional[str]:
+        """Return the closest cached report above the similarity threshold"""
+        neighbors = self.top_k(embedding, k=1)
+        if neighbors and neighbors[0][0] >= self.threshold:
+            return neighbors[0][2]
+        return None
+
+    def put(self, query: str, report: str, embedding=None):
+        """Store a report under its exact key and, if given, its embedding"""
+        now = time.time()
+        with self._lock:
+            self._exact[self.cache_key(query)] = (report, now)
+            if embedding is not None:
+                self._entries.append((embedding, query, report, now))
+            self._evict()
+
+    def _evict(self):
+        """Drop expired and overflow entries; caller holds the lock"""
+        self._exact = {
+            key: (report, ts) for key, (report, ts) in self._exact.items()
+            if self._is_fresh(ts)
+        }
+        while len(self._exact) > self.max_entries:
+            self._exact.pop(next(iter(self._exact)))
+
+        self._entries = [entry for entry in self._entries if self._is_fresh(entry[3])]
+        self._entries = self._entries[-self.max_entries:]
+        self._matrix = np.vstack([entry[0] for entry in self._entries]) if self._entries else None
+
+    def record(self, event: str):
+        """Count a cache outcome: hits, misses, or near_miss"""
+        with self._lock:
+            self.stats[event] += 1
+
+    def get_stats(self) -> dict:
+        """Return hit/miss counters plus current size of the cache"""
+        with self._lock:
+            stats = dict(self.stats)
+            stats["entries"] = len(self._exact)
+            stats["bytes"] = sum(len(report.encode("utf-8")) for report, _ in self._exact.values())
+        lookups = stats["hits"] + stats["near_miss"] + stats["misses"]
+        stats["hit_rate"] = round((stats["hits"] + stats["near_miss"]) / lookups, 3) if lookups else 0.0
+        return stats
+
+    def clear(self):
+        """Remove all cached reports"""
+        with self._lock:
+            self._exact.clear()
+            self._entries = []
+            self._matrix = None
+
+research_cache = SemanticCache(
+    embed_fn=embed_query if EMBEDDINGS_AVAILABLE else None,
+    threshold=Config.CACHE_SIMILARITY_THRESHOLD,
+    ttl=Config.CACHE_TTL,
+    max_entries=Config.CACHE_MAX_ENTRIES
+)
@@ -1,4 +1,5 @@
 import os
+from functools import lru_cache
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -13,6 +14,12 @@ class Config:
     # Search Configuration
     MAX_SEARCH_RESULTS = int(os.getenv("MAX_SEARCH_RESULTS", "5"))
     SEARCH_TIMEOUT = int(os.getenv("SEARCH_TIMEOUT", "30"))
+    # Empty uses the library default ("api" on 6.x, "auto" on 7.x+, where
+    # "api" is deprecated); set to api/html/lite to pin one
+    SEARCH_BACKEND = os.getenv("SEARCH_BACKEND", "")
+    DDG_PROXY = os.getenv("DDG_PROXY") or None
+    SEARCH_CACHE_SIZE = int(os.getenv("SEARCH_CACHE_SIZE", "512"))
+    SEARCH_CACHE_TTL = int(os.getenv("SEARCH_CACHE_TTL", "3600"))
     
     # CrewAI Configuration
     CREWAI_VERBOSE = os.getenv("CREWAI_VERBOSE", "false").lower() == "true"
@@ -21,17 +28,31 @@ class Config:
     # Ollama Configuration
     OLLAMA_HOST = os.getenv("OLLAMA_HOST", "http://localhost:11434")
     OLLAMA_MODEL = os.getenv("OLLAMA_MODEL", "llama2")
+    OLLAMA_TIMEOUT = int(os.getenv("OLLAMA_TIMEOUT", "10"))
+    
+    # Cache Configuration
+    CACHE_ENABLED = os.getenv("CACHE_ENABLED", "true").lower() == "true"
+    CACHE_TTL = int(os.getenv("CACHE_TTL", "3600"))
+    CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "1000"))
+    CACHE_SIMILARITY_THRESHOLD = float(os.getenv("CACHE_SIMILARITY_THRESHOLD", "0.92"))
+    CACHE_EMBEDDING_MODEL = os.getenv("CACHE_EMBEDDING_MODEL", "all-MiniLM-L6-v2")
+    CACHE_SYNTHESIS_ENABLED = os.getenv("CACHE_SYNTHESIS_ENABLED", "false").lower() == "true"
+    CACHE_NEAR_MISS_THRESHOLD = float(os.getenv("CACHE_NEAR_MISS_THRESHOLD", "0.75"))
+    PREFETCH_ENABLED = os.getenv("PREFETCH_ENABLED", "true").lower() == "true"
+    PREFETCH_MAX_QUERIES = int(os.getenv("PREFETCH_MAX_QUERIES", "3"))
     
     # Application Settings
     APP_TITLE = "🔍 AI Research Assistant"
     APP_ICON = "🔍"
     
     @classmethod
+    @lru_cache(maxsize=1)
     def has_openai_key(cls) -> bool:
         """Check if OpenAI API key is configured"""
         return cls.OPENAI_API_KEY is not None and cls.OPENAI_API_KEY.strip() != ""
     
     @classmethod
+    @lru_cache(maxsize=1)
     def get_llm_config(cls) -> dict:
         """Get LLM configuration based on available options"""
         if cls.has_openai_key():
@@ -1,21 +1,86 @@
 import asyncio
+import inspect
 import sys
 import os
-from typing import Optional
+import time
+from typing import Awaitable, Callable, Dict, List, Optional, Set, Tuple, Union
 from config import Config
 from utils import Utils
+from cache import research_cache
 
 # Add the current directory to the path
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 try:
-    from agents import run_research, test_search_tool
+    from agents import run_research, simple_research_async, test_search_tool
 except ImportError as e:
     print(f"Error importing required modules: {e}")
     print("Please install required dependencies:")
     print("pip install -r requirements.txt")
     sys.exit(1)
 
+class BatchingSearcher:
+    """Coalesce concurrent queries so identical ones share a single call"""
+    
+    def __init__(self, func: Callable[[str], Union[str, Awaitable[str]]], window: float = 0.05):
+        self.func = func
+        self.window = window
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        # Normalized query -> result future, from submit until the call finishes
+        self._inflight: Dict[str, asyncio.Future] = {}
+        # Strong references to in-flight dispatches so they are not garbage collected
+        self._tasks: Set[asyncio.Task] = set()
+    
+    async def submit(self, query: str) -> str:
+        """Queue a query, or join the running call for an identical one, and wait for its result"""
+        key = Utils.normalize_query(query)
+        future = self._inflight.get(key)
+        
+        if future is None:
+            if self._worker is None or self._worker.done():
+                self._queue = asyncio.Queue()
+                self._worker = asyncio.create_task(self._drain())
+            
+            future = asyncio.get_running_loop().create_future()
+            self._inflight[key] = future
+            future.add_done_callback(lambda _: self._inflight.pop(key, None))
+            await self._queue.put((query, future))
+        
+        # Shielded so one cancelled waiter does not cancel the shared result
+        return await asyncio.shield(future)
+    
+    async def _drain(self):
+        """Collect queries over the batching window and dispatch each batch"""
+        while True:
+            batch: List[Tuple[str, asyncio.Future]] = [await self._queue.get()]
+            
+            await asyncio.sleep(self.window)
+            while not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            
+            # Dispatch without blocking the next window on slow calls
+            task = asyncio.create_task(self._dispatch(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+    
+    async def _dispatch(self, batch: List[Tuple[str, asyncio.Future]]):
+        """Run each queued query once and resolve its shared future"""
+        # Coroutine functions run on the loop; blocking ones go to a worker thread
+        if inspect.iscoroutinefunction(self.func):
+            calls = [self.func(query) for query, _ in batch]
+        else:
+            calls = [asyncio.to_thread(self.func, query) for query, _ in batch]
+        
+        results = await asyncio.gather(*calls, return_exceptions=True)
+        for (_, future), result in zip(batch, results):
+            if future.done():
+                continue
+            if isinstance(result, BaseException):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
 # Try to import MCP components
 try:
     from mcp.server.fastmcp import FastMCP
@@ -24,10 +89,27 @@ except ImportError:
     print("MCP not available. Install with: pip install mcp fastmcp")
     MCP_AVAILABLE = False
 
+# Last search health probe, reused for HEALTH_CACHE_TTL seconds
+HEALTH_CACHE_TTL = 60
+_health_cache = {"ts": 0.0, "ok": False}
+
+async def search_is_healthy() -> bool:
+    """Check the search tool off the event loop, caching the result briefly"""
+    if time.time() - _health_cache["ts"] < HEALTH_CACHE_TTL:
+        return _health_cache["ok"]
+    
+    test_result = await asyncio.to_thread(test_search_tool)
+    _health_cache["ok"] = bool(test_result)
+    _health_cache["ts"] = time.time()
+    return _health_cache["ok"]
+
 if MCP_AVAILABLE:
     # Initialize MCP server
     mcp = FastMCP("ai_research_assistant")
     
+    research_batcher = BatchingSearcher(run_research)
+    search_batcher = BatchingSearcher(simple_research_async)
+    
     @mcp.tool()
     async def crew_research(query: str) -> str:
         """
@@ -45,11 +127,10 @@ if MCP_AVAILABLE:
             if not is_valid:
                 return f"Error: {message}"
             
-            Utils.log_info(f"MCP Research request: {query}")
+            Utils.log_info("MCP Research request: %s", query)
             
-            # Run research in executor to avoid blocking
-            loop = asyncio.get_event_loop()
-            result = await loop.run_in_executor(None, run_research, query)
+            # Run research off the event loop, sharing identical in-flight queries
+            result = await research_batcher.submit(query)
             
             return result
             
@@ -69,10 +150,7 @@ if MCP_AVAILABLE:
             Utils.log_info("MCP Health check requested")
             
             # Test search functionality
-            loop = asyncio.get_event_loop()
-            test_result = await loop.run_in_executor(None, test_search_tool)
-            
-            if test_result:
+            if await search_is_healthy():
                 status = "✅ Research system is healthy and ready!"
                 if Config.has_openai_key():
                     status += " (OpenAI configured)"
@@ -94,6 +172,8 @@ if MCP_AVAILABLE:
         Returns:
             str: Description of available capabilities
         """
+        search_ok = await search_is_healthy()
+        
         capabilities = f"""
 🔍 **AI Research Assistant Capabilities**
 
@@ -128,11 +208,30 @@ if MCP_AVAILABLE:
 - "Sustainable energy solutions comparison"
 
 **🔧 System Status:**
-- Search functionality: {"✅ Working" if test_search_tool() else "❌ Issues detected"}
+- Search functionality: {"✅ Working" if search_ok else "❌ Issues detected"}
 - Configuration: {"✅ Full features" if Config.has_openai_key() else "⚠️ Basic mode"}
 """
         return capabilities
     
+    @mcp.tool()
+    async def cache_stats() -> str:
+        """
+        Get research cache hit/miss counters and size.
+        
+        Returns:
+            str: Cache statistics summary
+        """
+        stats = research_cache.get_stats()
+        return f"""
+📦 **Research Cache Stats**
+
+- Hits: {stats["hits"]}
+- Near misses (synthesized): {stats["near_miss"]}
+- Misses: {stats["misses"]}
+- Hit rate: {stats["hit_rate"]:.0%}
+- Cached reports: {stats["entries"]} ({stats["bytes"]} bytes)
+"""
+    
     @mcp.tool()
     async def quick_search(query: str) -> str:
         """
@@ -150,13 +249,10 @@ if MCP_AVAILABLE:
             if not is_valid:
                 return f"Error: {message}"
             
-            Utils.log_info(f"MCP Quick search: {query}")
-            
-            from agents import simple_research
+            Utils.log_info("MCP Quick search: %s", query)
             
-            # Run simple search
-            loop = asyncio.get_event_loop()
-            result = await loop.run_in_executor(None, simple_research, query)
+            # Run simple search, sharing identical in-flight queries
+            result = await search_batcher.submit(query)
             
             return result
             
@@ -173,6 +269,7 @@ def run_mcp_server():
         print("  • quick_search: Fast web search without analysis")
         print("  • health_check: System health verification")
         print("  • get_capabilities: System capabilities overview")
+        print("  • cache_stats: Research cache hit/miss statistics")
         print("📡 Server ready for connections...")
         
         mcp.run(transport="stdio")
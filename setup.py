@@ -1,87 +1,88 @@
+import hashlib
+import importlib
+import importlib.metadata
+import importlib.util
 import os
 import sys
 import subprocess
-import shutil
+from os.path import exists as _exists
 from pathlib import Path
 
-def print_banner():
-    """Print setup banner"""
-    print("🚀 AI Research Assistant Setup")
-    print("=" * 50)
-    print("Setting up your intelligent research companion...")
-    print("=" * 50)
-
-def run_command(command, description=""):
-    """Run a shell command and handle errors"""
-    print(f"\n🔧 {description}")
-    print(f"Command: {command}")
-    print("-" * 30)
-    
+# Always run pip as "python -m pip" under this interpreter rather than a
+# `pip` found on PATH, which may belong to another Python; this also spares
+# a PATH (and PATHEXT on Windows) search on every launch
+PIP_EXE = sys.executable
+
+# pip invocation prefix, built once; runs with the same site setup as this
+# script so pip and the checks below agree on what is installed
+PIP_ARGV = [PIP_EXE, "-m", "pip"]
+
+# pip releases at or above this are new enough to skip self-upgrading
+PIP_MIN_VERSION = (23, 0)
+
+def pip_needs_upgrade():
+    """Check the installed pip version from metadata, without running pip"""
     try:
-        result = subprocess.run(
-            command, 
-            shell=True, 
-            check=True, 
-            capture_output=True, 
-            text=True
-        )
-        print("✅ Success!")
-        if result.stdout.strip():
-            print(f"Output: {result.stdout.strip()}")
+        version = importlib.metadata.version("pip")
+        return tuple(int(part) for part in version.split(".")[:2]) < PIP_MIN_VERSION
+    except (importlib.metadata.PackageNotFoundError, ValueError):
         return True
-    except subprocess.CalledProcessError as e:
-        print(f"❌ Error: {e}")
-        if e.stderr:
-            print(f"Error details: {e.stderr}")
-        return False
-    except Exception as e:
-        print(f"❌ Unexpected error: {e}")
-        return False
 
-def check_python_version():
-    """Check if Python version is compatible"""
-    print("🐍 Checking Python version...")
-    version = sys.version_info
-    
-    if version.major < 3 or (version.major == 3 and version.minor < 9):
-        print(f"❌ Python {version.major}.{version.minor} is too old.")
-        print("💡 Please use Python 3.9 or newer")
-        print("   Download from: https://www.python.org/downloads/")
-        return False
-    
-    print(f"✅ Python {version.major}.{version.minor}.{version.micro} is compatible")
-    return True
+# Records the requirements.txt hash of the last fully verified install
+SETUP_SENTINEL = ".setup_ok"
 
-def check_pip():
-    """Check if pip is available and update it"""
-    print("📦 Checking pip...")
-    
+def requirements_hash():
+    """Hash the interpreter and requirements.txt so a verified install can be recognized later"""
     try:
-        import pip
-        print("✅ pip is available")
-        
-        # Update pip
-        return run_command(
-            f"{sys.executable} -m pip install --upgrade pip",
-            "Updating pip to latest version"
-        )
-    except ImportError:
-        print("❌ pip is not installed")
-        print("💡 Please install pip first")
-        return False
+        digest = hashlib.sha256(sys.executable.encode("utf-8"))
+        digest.update(Path("requirements.txt").read_bytes())
+        return digest.hexdigest()
+    except OSError:
+        return None
 
-def install_dependencies():
-    """Install required dependencies"""
-    print("📚 Installing dependencies...")
-    
-    # Check if requirements.txt exists
-    if not Path("requirements.txt").exists():
-        print("❌ requirements.txt not found")
-        print("💡 Creating basic requirements.txt...")
-        
-        requirements = """streamlit>=1.28.0
+# Banner and closing instructions, each written with a single call
+BANNER = f"""🚀 AI Research Assistant Setup
+{"=" * 50}
+Setting up your intelligent research companion...
+{"=" * 50}
+"""
+
+NEXT_STEPS = f"""
+{"=" * 50}
+🎉 Setup completed successfully!
+{"=" * 50}
+
+📚 Next steps:
+1. (Optional) Add your OpenAI API key to .env file:
+   OPENAI_API_KEY=your_api_key_here
+   Get one from: https://platform.openai.com/api-keys
+
+2. Run the application:
+   streamlit run app.py
+
+3. Open your browser to:
+   http://localhost:8501
+
+4. Start researching!
+   Ask questions like:
+   • 'What is quantum computing?'
+   • 'Latest AI developments 2024'
+   • 'Climate change solutions'
+
+🔧 Alternative modes:
+- Standalone mode: python server.py --standalone
+- MCP server: python server.py
+
+💡 Troubleshooting:
+- If you see LLM errors, the app will use fallback mode
+- For local LLM, install Ollama: https://ollama.ai/
+- Check logs for detailed error information
+"""
+
+# Default contents for files created when missing
+_REQUIREMENTS_TXT = """streamlit>=1.28.0
 crewai>=0.28.0
-duckduckgo-search>=3.9.0
+duckduckgo-search>=6.1.0
 python-dotenv>=1.0.0
 pydantic>=2.0.0
 requests>=2.31.0
@@ -90,31 +91,13 @@ lxml>=4.9.0
 openai>=1.0.0
 langchain>=0.1.0
 langchain-openai>=0.1.0
+cachetools>=5.0.0
+tenacity>=8.0.0
+numpy>=1.24.0
+sentence-transformers>=2.2.0
 """
-        
-        with open("requirements.txt", "w") as f:
-            f.write(requirements)
-        
-        print("✅ requirements.txt created")
-    
-    # Install requirements
-    return run_command(
-        f"{sys.executable} -m pip install -r requirements.txt",
-        "Installing required packages"
-    )
 
-def create_env_file():
-    """Create .env file if it doesn't exist"""
-    env_path = Path(".env")
-    template_path = Path(".env.template")
-    
-    if env_path.exists():
-        print("✅ .env file already exists")
-        return True
-    
-    print("📝 Creating .env file...")
-    
-    env_content = """# OpenAI API Key (Optional - for better LLM performance)
+_ENV_TEMPLATE = """# OpenAI API Key (Optional - for better LLM performance)
 # Get your API key from: https://platform.openai.com/api-keys
 # OPENAI_API_KEY=your_openai_api_key_here
 
@@ -130,68 +113,8 @@ def create_env_file():
 # OLLAMA_HOST=http://localhost:11434
 # OLLAMA_MODEL=llama2
 """
-    
-    try:
-        with open(env_path, "w") as f:
-            f.write(env_content)
-        print("✅ .env file created successfully")
-        return True
-    except Exception as e:
-        print(f"❌ Failed to create .env file: {e}")
-        return False
 
-def test_installation():
-    """Test if the installation works"""
-    print("🧪 Testing installation...")
-    
-    try:
-        # Test basic imports
-        print("Testing imports...")
-        
-        import streamlit
-        print("✅ Streamlit imported successfully")
-        
-        from duckduckgo_search import DDGS
-        print("✅ DuckDuckGo search imported successfully")
-        
-        import crewai
-        print("✅ CrewAI imported successfully")
-        
-        # Test our modules
-        try:
-            from agents import test_search_tool
-            print("✅ Agents module imported successfully")
-            
-            # Test search functionality
-            print("Testing search functionality...")
-            result = test_search_tool()
-            if result:
-                print("✅ Search functionality working")
-            else:
-                print("⚠️ Search functionality has issues (but installation is complete)")
-                
-        except ImportError as e:
-            print(f"❌ Failed to import agents module: {e}")
-            return False
-        
-        return True
-        
-    except ImportError as e:
-        print(f"❌ Import error: {e}")
-        print("💡 Try running: pip install -r requirements.txt")
-        return False
-    except Exception as e:
-        print(f"❌ Test error: {e}")
-        return False
-
-def create_missing_files():
-    """Create any missing essential files"""
-    print("📁 Checking for missing files...")
-    
-    # Create .gitignore if missing
-    gitignore_path = Path(".gitignore")
-    if not gitignore_path.exists():
-        gitignore_content = """# Environment files
+_GITIGNORE_TEMPLATE = """# Environment files
 .env
 .env.local
 .env.production
@@ -239,45 +162,245 @@ logs/
 
 # Streamlit
 .streamlit/
+
+# Setup
+.setup_ok
 """
-        try:
-            with open(gitignore_path, "w") as f:
-                f.write(gitignore_content)
-            print("✅ .gitignore created")
-        except Exception as e:
-            print(f"⚠️ Could not create .gitignore: {e}")
 
-def print_next_steps():
-    """Print next steps for the user"""
-    print("\n" + "=" * 50)
-    print("🎉 Setup completed successfully!")
-    print("=" * 50)
+def create_file(path, content):
+    """Create a file only if it does not exist yet; return whether it was created
     
-    print("\n📚 Next steps:")
-    print("1. (Optional) Add your OpenAI API key to .env file:")
-    print("   OPENAI_API_KEY=your_api_key_here")
-    print("   Get one from: https://platform.openai.com/api-keys")
+    O_CREAT|O_EXCL makes the existence check and creation a single atomic
+    step, so concurrent setup runs cannot both write the same file.
+    """
+    try:
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o644)
+    except FileExistsError:
+        return False
     
-    print("\n2. Run the application:")
-    print("   streamlit run app.py")
+    try:
+        os.write(fd, content.encode("utf-8"))
+    finally:
+        os.close(fd)
+    return True
+
+def print_banner():
+    """Print setup banner"""
+    sys.stdout.write(BANNER)
+
+def start_command(argv, description=""):
+    """Launch a command given as an argv list without waiting for it
     
-    print("\n3. Open your browser to:")
-    print("   http://localhost:8501")
+    The child inherits stdout/stderr, so long outputs stream to the
+    terminal instead of being buffered in memory.
+    """
+    sys.stdout.write(f"\n🔧 {description}\nCommand: {' '.join(argv)}\n{'-' * 30}\n")
+    sys.stdout.flush()
     
-    print("\n4. Start researching!")
-    print("   Ask questions like:")
-    print("   • 'What is quantum computing?'")
-    print("   • 'Latest AI developments 2024'")
-    print("   • 'Climate change solutions'")
+    try:
+        # No shell, and close_fds=False lets CPython use posix_spawn()
+        return subprocess.Popen(argv, close_fds=False)
+    except Exception as e:
+        print(f"❌ Unexpected error: {e}")
+        return None
+
+def finish_command(proc):
+    """Wait for a command started by start_command and report the outcome"""
+    if proc is None:
+        return False
     
-    print("\n🔧 Alternative modes:")
-    print("- Standalone mode: python server.py --standalone")
-    print("- MCP server: python server.py")
+    proc.wait()
+    if proc.returncode != 0:
+        sys.stdout.write(f"❌ Error: Command '{' '.join(proc.args)}' returned non-zero exit status {proc.returncode}.\n")
+        return False
     
-    print("\n💡 Troubleshooting:")
-    print("- If you see LLM errors, the app will use fallback mode")
-    print("- For local LLM, install Ollama: https://ollama.ai/")
-    print("- Check logs for detailed error information")
+    sys.stdout.write("✅ Success!\n")
+    return True
+
+def check_python_version():
+    """Check if Python version is compatible"""
+    print("🐍 Checking Python version...")
+    version = sys.version_info
+    
+    if version.major < 3 or (version.major == 3 and version.minor < 9):
+        print(f"❌ Python {version.major}.{version.minor} is too old.")
+        print("💡 Please use Python 3.9 or newer")
+        print("   Download from: https://www.python.org/downloads/")
+        return False
+    
+    print(f"✅ Python {version.major}.{version.minor}.{version.micro} is compatible")
+    return True
+
+def check_pip():
+    """Check if pip is available"""
+    print("📦 Checking pip...")
+    
+    # find_spec locates pip without executing its heavy package import
+    if importlib.util.find_spec("pip") is not None:
+        print("✅ pip is available")
+        return True
+    
+    print("❌ pip is not installed")
+    print("💡 Please install pip first")
+    return False
+
+def start_install():
+    """Start installing required dependencies in the background"""
+    print("📚 Installing dependencies...")
+    
+    # Create a basic requirements.txt if none exists
+    if create_file("requirements.txt", _REQUIREMENTS_TXT):
+        print("💡 requirements.txt not found, created a basic one")
+    
+    # Prefer wheels over building sdists; pip's own cache (and PIP_CACHE_DIR,
+    # if set) is left to pip so --no-cache-dir and pip.conf keep working
+    argv = PIP_ARGV + ["install", "--prefer-binary", "--only-binary=lxml"]
+    description = "Installing required packages"
+    
+    # Fold a pip upgrade into the same run only when pip is outdated; a version
+    # spec rather than --upgrade, which would also upgrade every requirement
+    if pip_needs_upgrade():
+        argv.append("pip>=" + ".".join(str(part) for part in PIP_MIN_VERSION))
+        description = "Updating pip and installing required packages"
+    
+    return start_command(argv + ["-r", "requirements.txt"], description)
+
+def requirements_satisfied():
+    """Check whether every entry in requirements.txt is already installed"""
+    try:
+        from packaging.requirements import InvalidRequirement, Requirement
+    except ImportError:
+        try:
+            # pip vendors packaging, so it is available even in a bare venv
+            from pip._vendor.packaging.requirements import InvalidRequirement, Requirement
+        except ImportError:
+            return False
+    
+    try:
+        lines = Path("requirements.txt").read_text(encoding="utf-8").splitlines()
+    except OSError:
+        return False
+    
+    for line in lines:
+        line = line.split("#", 1)[0].strip()
+        if not line:
+            continue
+        
+        # pip options and nested files can't be checked without pip itself
+        if line.startswith("-"):
+            return False
+        
+        try:
+            requirement = Requirement(line)
+        except InvalidRequirement:
+            return False
+        
+        if requirement.marker is not None and not requirement.marker.evaluate():
+            continue
+        
+        try:
+            installed = importlib.metadata.version(requirement.name)
+        except importlib.metadata.PackageNotFoundError:
+            return False
+        
+        if not requirement.specifier.contains(installed, prereleases=True):
+            return False
+    
+    return True
+
+def finish_install(proc):
+    """Wait for the background install started by start_install"""
+    return finish_command(proc)
+
+def create_env_file():
+    """Create .env file if it doesn't exist"""
+    env_path = ".env"
+    
+    try:
+        if not create_file(env_path, _ENV_TEMPLATE):
+            print("✅ .env file already exists")
+            return True
+        print("✅ .env file created successfully")
+        return True
+    except Exception as e:
+        print(f"❌ Failed to create .env file: {e}")
+        return False
+
+def test_installation(force=False):
+    """Test if the installation works, skipping it if already verified"""
+    print("🧪 Testing installation...")
+    
+    current_hash = requirements_hash()
+    if not force and current_hash and _exists(SETUP_SENTINEL):
+        if Path(SETUP_SENTINEL).read_text(encoding="utf-8").strip() == current_hash:
+            print("✅ Installation already verified (use --force-test to re-run tests)")
+            return True
+    
+    try:
+        # Test basic imports
+        print("Testing imports...")
+        
+        required_modules = [
+            ("streamlit", "Streamlit"),
+            ("duckduckgo_search", "DuckDuckGo search"),
+            ("crewai", "CrewAI")
+        ]
+        
+        # Cheap existence check first so a missing package fails fast
+        for module, label in required_modules:
+            if importlib.util.find_spec(module) is None:
+                print(f"❌ {label} is not installed")
+                print("💡 Try running: pip install -r requirements.txt")
+                return False
+        
+        for module, label in required_modules:
+            importlib.import_module(module)
+            print(f"✅ {label} imported successfully")
+        
+        # Test our modules only once third-party imports succeed
+        try:
+            from agents import test_search_tool
+            print("✅ Agents module imported successfully")
+            
+            # Test search functionality
+            print("Testing search functionality...")
+            result = test_search_tool()
+            if result and not result.startswith("Search error"):
+                print("✅ Search functionality working")
+                if current_hash:
+                    Path(SETUP_SENTINEL).write_text(current_hash, encoding="utf-8")
+            else:
+                print("⚠️ Search functionality has issues (but installation is complete)")
+                
+        except ImportError as e:
+            print(f"❌ Failed to import agents module: {e}")
+            return False
+        
+        return True
+        
+    except ImportError as e:
+        print(f"❌ Import error: {e}")
+        print("💡 Try running: pip install -r requirements.txt")
+        return False
+    except Exception as e:
+        print(f"❌ Test error: {e}")
+        return False
+
+def create_missing_files():
+    """Create any missing essential files"""
+    print("📁 Checking for missing files...")
+    
+    # Create .gitignore if missing
+    gitignore_path = ".gitignore"
+    try:
+        if create_file(gitignore_path, _GITIGNORE_TEMPLATE):
+            print("✅ .gitignore created")
+    except Exception as e:
+        print(f"⚠️ Could not create .gitignore: {e}")
+
+def print_next_steps():
+    """Print next steps for the user"""
+    sys.stdout.write(NEXT_STEPS)
 
 def main():
     """Main setup function"""
@@ -291,20 +414,24 @@ def main():
     if not check_pip():
         return False
     
-    # Install dependencies
-    if not install_dependencies():
-        print("❌ Failed to install dependencies")
-        print("💡 Try running manually: pip install -r requirements.txt")
-        return False
+    # Install dependencies in the background, unless already satisfied
+    install_needed = not requirements_satisfied()
+    if install_needed:
+        proc = start_install()
+    else:
+        print("✅ All requirements already satisfied, skipping install")
     
-    # Create environment file
+    # Create environment file and missing files while pip runs
     create_env_file()
-    
-    # Create missing files
     create_missing_files()
     
+    if install_needed and not finish_install(proc):
+        print("❌ Failed to install dependencies")
+        print("💡 Try running manually: pip install -r requirements.txt")
+        return False
+    
     # Test installation
-    if not test_installation():
+    if not test_installation(force="--force-test" in sys.argv):
         print("❌ Installation test failed")
         print("💡 Some features may not work properly")
         # Don't return False here - basic setup might still work
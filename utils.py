@@ -7,6 +7,10 @@ from datetime import datetime
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Patterns used by clean_text on every search result, compiled once
+WHITESPACE_PATTERN = re.compile(r'\s+')
+UNSAFE_CHARS_PATTERN = re.compile(r'[^\w\s\-.,!?;:()\[\]{}"\']')
+
 class Utils:
     """Utility functions for the application"""
     
@@ -17,13 +21,18 @@ class Utils:
             return ""
         
         # Remove extra whitespace
-        text = re.sub(r'\s+', ' ', text).strip()
+        text = WHITESPACE_PATTERN.sub(' ', text).strip()
         
         # Remove special characters that might cause issues
-        text = re.sub(r'[^\w\s\-.,!?;:()\[\]{}"\']', '', text)
+        text = UNSAFE_CHARS_PATTERN.sub('', text)
         
         return text
     
+    @staticmethod
+    def normalize_query(query: str) -> str:
+        """Normalize a query for use as a cache key"""
+        return " ".join(query.lower().split())
+    
     @staticmethod
     def truncate_text(text: str, max_length: int = 500) -> str:
         """Truncate text to specified length"""
@@ -100,10 +109,11 @@ This research was conducted using:
     @staticmethod
     def validate_query(query: str) -> tuple[bool, str]:
         """Validate research query"""
-        if not query or not query.strip():
+        stripped = query.strip() if query else ""
+        if not stripped:
             return False, "Query cannot be empty"
         
-        if len(query.strip()) < 3:
+        if len(stripped) < 3:
             return False, "Query must be at least 3 characters long"
         
         if len(query) > 500:
@@ -114,9 +124,9 @@ This research was conducted using:
     @staticmethod
     def log_error(error: Exception, context: str = ""):
         """Log errors with context"""
-        logger.error(f"Error in {context}: {str(error)}", exc_info=True)
+        logger.error("Error in %s: %s", context, error, exc_info=True)
     
     @staticmethod
-    def log_info(message: str):
-        """Log information messages"""
-        logger.info(message)
\ No newline at end of file
+    def log_info(message: str, *args):
+        """Log information messages, formatting args only if emitted"""
+        logger.info(message, *args)
\ No newline at end of file